@@ -50,3 +50,25 @@ def pause(
         return resp.json()
     except json.JSONDecodeError as exc:
         raise ValueError("invalid JSON response") from exc
+
+
+async def pause_async(
+    session,
+    account_token: str,
+    lang: str,
+    base_url: str = BASE_URL,
+) -> Dict[str, Any]:
+    # session is an aiohttp.ClientSession; its ClientTimeout bounds the request.
+    url = f"{base_url}/api/user/pause"
+    payload = build_payload(account_token, lang)
+
+    async with session.post(
+        url,
+        json=payload,
+        headers={**DEFAULT_HEADERS, "Content-Type": "application/json; charset=UTF-8"},
+    ) as resp:
+        resp.raise_for_status()
+        try:
+            return await resp.json(content_type=None)
+        except json.JSONDecodeError as exc:
+            raise ValueError("invalid JSON response") from exc
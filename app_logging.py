@@ -8,6 +8,7 @@ from pathlib import Path
 
 DEFAULT_RETENTION_DAYS = 30
 DEFAULT_LOG_DIRNAME = "log"
+LOG_FILENAME = "leishen-auto.log"
 LOGGER_NAME = "leishen_auto"
 
 
@@ -48,6 +49,11 @@ def cleanup_old_logs(log_dir: Path, retention_days: int) -> None:
             continue
 
 
+def iter_log_files(log_dir: Path) -> list[Path]:
+    # Rotated files are named leishen-auto.log.YYYY-MM-DD, optionally .gz.
+    return sorted(path for path in log_dir.glob(f"{LOG_FILENAME}*") if path.is_file())
+
+
 def setup_logging() -> std_logging.Logger:
     log_dir = get_log_dir()
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -62,7 +68,7 @@ def setup_logging() -> std_logging.Logger:
     formatter = std_logging.Formatter("%(asctime)s %(levelname)s %(message)s")
 
     file_handler = TimedRotatingFileHandler(
-        log_dir / "leishen-auto.log",
+        log_dir / LOG_FILENAME,
         when="D",
         interval=1,
         backupCount=retention_days,
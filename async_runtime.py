@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dt_time, timedelta
+from functools import partial
+
+import aiohttp
+
+from api.client import pause_async
+from runner import (
+    claim_accounts,
+    execute_pause,
+    finish_account,
+    format_pause_replies,
+    interval_run_key,
+    parse_time_value,
+    pause_targets,
+    renew_lease,
+    seconds_until,
+    sync_shared_token,
+    takeover_due,
+)
+from telegram_commands import TELEGRAM_COMMANDS, accept_updates, prepare_telegram_poll, run_command
+from telegram_notify import get_updates_async, send_telegram_message_async
+
+# Telegram rejects messages longer than 4096 characters.
+TELEGRAM_MAX_MESSAGE = 4000
+
+
+def _chunk_messages(messages: list[str]) -> list[str]:
+    chunks: list[str] = []
+    current = ""
+    for message in messages:
+        message = message[:TELEGRAM_MAX_MESSAGE]
+        if current and len(current) + len(message) + 2 > TELEGRAM_MAX_MESSAGE:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{message}" if current else message
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class AsyncRuntime:
+    def __init__(self, logger, cfg: dict, state: dict) -> None:
+        self.logger = logger
+        self.cfg = cfg
+        self.state = state
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pause_workers: ThreadPoolExecutor | None = None
+        self._notifications: asyncio.Queue[str] | None = None
+        self._run_lock: asyncio.Lock | None = None
+        self._takeovers: set[asyncio.Task] = set()
+
+    async def _open(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._pause_workers = ThreadPoolExecutor(
+            max_workers=max(1, self.cfg["async_concurrency"]),
+            thread_name_prefix="pause",
+        )
+        self._notifications = asyncio.Queue()
+        self._run_lock = asyncio.Lock()
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.cfg["timeout_seconds"]),
+        )
+
+    async def _close(self) -> None:
+        if self._pause_workers is not None:
+            self._pause_workers.shutdown(wait=False, cancel_futures=True)
+            self._pause_workers = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def notify(self, message: str) -> None:
+        if not self.cfg.get("telegram_enabled"):
+            return
+        if not self.cfg.get("telegram_bot_token") or not self.cfg.get("telegram_chat_id"):
+            self.logger.warning("telegram enabled but BOT_TOKEN/CHAT_ID missing")
+            return
+        self._notifications.put_nowait(message)
+
+    async def _notification_worker(self) -> None:
+        # Messages queued while a send is in flight go out together, so a run
+        # over many accounts does not hit Telegram's per-chat rate limit.
+        while True:
+            messages = [await self._notifications.get()]
+            while not self._notifications.empty():
+                messages.append(self._notifications.get_nowait())
+            for chunk in _chunk_messages(messages):
+                try:
+                    await send_telegram_message_async(
+                        self._session,
+                        self.cfg["telegram_bot_token"],
+                        self.cfg["telegram_chat_id"],
+                        chunk,
+                    )
+                except Exception as exc:
+                    self.logger.warning("telegram notify failed: %s", exc)
+            for _ in messages:
+                self._notifications.task_done()
+
+    def _send_pause(self, cfg: dict, token: str) -> dict:
+        # Called on a pause worker; the request itself runs on the event loop.
+        future = asyncio.run_coroutine_threadsafe(
+            pause_async(self._session, token, cfg["lang"], base_url=cfg["base_url"]),
+            self._loop,
+        )
+        # The session's ClientTimeout ends the request; this bound only
+        # matters if the loop stops before running it.
+        return future.result(timeout=cfg["timeout_seconds"] * 2)
+
+    async def _execute_pause(self, account_cfg: dict) -> tuple[int, str | None]:
+        # The shared execute_pause runs on one of ASYNC_CONCURRENCY workers,
+        # so its latency excludes the wait for a free worker and a token
+        # re-fetch never blocks the loop.
+        return await self._loop.run_in_executor(
+            self._pause_workers,
+            partial(execute_pause, self.logger, account_cfg, self.state, send=self._send_pause),
+        )
+
+    async def _run_account(self, account_cfg: dict, labelled: bool) -> int:
+        code, message = await self._execute_pause(account_cfg)
+        notice = await asyncio.to_thread(
+            finish_account, self.logger, self.state, account_cfg, code, message, labelled
+        )
+        if notice:
+            self.notify(notice)
+        return code
+
+    async def run_once(self) -> int:
+        # Serialized so a heartbeat takeover never overlaps a scheduled run.
+        # Coordinator calls go through to_thread so a locked SQLite file never
+        # stalls the event loop.
+        async with self._run_lock:
+            accounts, labelled, exit_code = await asyncio.to_thread(
+                claim_accounts, self.logger, self.cfg, self.state
+            )
+            codes = await asyncio.gather(*(self._run_account(account_cfg, labelled) for account_cfg in accounts))
+            return max([exit_code, *codes])
+
+    async def _command_pause(self) -> str:
+        # Holds the run lock so /pause never re-fetches a token alongside a
+        # scheduled run or a takeover.
+        async with self._run_lock:
+            accounts = pause_targets(self.cfg)
+            results = await asyncio.gather(*(self._execute_pause(account_cfg) for account_cfg in accounts))
+        return format_pause_replies(accounts, results)
+
+    async def _poll_telegram(self) -> None:
+        prepared = await asyncio.to_thread(prepare_telegram_poll, self.logger, self.cfg, self.state)
+        if prepared is None:
+            return
+        bot_token, chat_id = prepared
+
+        try:
+            resp = await get_updates_async(self._session, bot_token, offset=self.state.get("offset"))
+        except Exception as exc:
+            self.logger.warning("telegram getUpdates failed: %s", exc)
+            return
+
+        commands, notices = await asyncio.to_thread(accept_updates, self.logger, self.state, resp, chat_id)
+        if not commands and not notices:
+            return
+
+        replies = []
+        for name in TELEGRAM_COMMANDS:
+            if name not in commands:
+                continue
+            if name != "/pause":
+                replies.append(
+                    await asyncio.to_thread(run_command, self.logger, self.cfg, self.state, name, commands[name])
+                )
+                continue
+            try:
+                replies.append(await self._command_pause())
+            except Exception as exc:
+                self.logger.warning("telegram command %s failed: %s", name, exc)
+                replies.append(f"{name} failed: {exc}")
+        replies.extend(notices)
+
+        self.notify("\n\n".join(replies))
+
+    async def _telegram_loop(self) -> None:
+        if not self.cfg.get("telegram_enabled"):
+            return
+
+        poll_seconds = int(self.cfg.get("telegram_poll_seconds", 0))
+        poll_time = None
+        if poll_seconds <= 0:
+            poll_time_value = self.cfg.get("telegram_poll_time", "")
+            if not poll_time_value:
+                return
+            try:
+                poll_time = parse_time_value(poll_time_value, "TELEGRAM_POLL_TIME")
+            except ValueError as exc:
+                self.logger.warning("invalid TELEGRAM_POLL_TIME: %s", exc)
+                return
+
+        while True:
+            if poll_time is not None:
+                seconds, _ = seconds_until(poll_time, self.state["clock"])
+            else:
+                seconds = poll_seconds
+            await asyncio.sleep(seconds)
+            await self._poll_telegram()
+
+    async def _heartbeat_loop(self) -> None:
+        coordinator = self.state.get("coordinator")
+        if coordinator is None:
+            return
+
+        while True:
+            await asyncio.sleep(coordinator.heartbeat_interval)
+            # The takeover runs as its own task so heartbeats keep renewing the
+            # lease while it pauses accounts.
+            if not await asyncio.to_thread(renew_lease, self.logger, coordinator):
+                continue
+            if takeover_due(self.cfg, self.state) and not self._run_lock.locked():
+                task = asyncio.create_task(self.run_once())
+                self._takeovers.add(task)
+                task.add_done_callback(self._takeover_done)
+            else:
+                await asyncio.to_thread(sync_shared_token, self.logger, self.cfg, self.state)
+
+    def _takeover_done(self, task: asyncio.Task) -> None:
+        self._takeovers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("takeover run failed: %s", task.exception())
+
+    async def _daily_loop(self, run_time: dt_time) -> None:
+        clock = self.state["clock"]
+        while True:
+            seconds, target = seconds_until(run_time, clock)
+            self.state["next_run_at"] = target
+            self.logger.info("next run scheduled at %s", target.strftime("%Y-%m-%d %H:%M:%S"))
+            await asyncio.sleep(seconds)
+            self.state["run_key"] = target.strftime("%Y-%m-%d %H:%M")
+            await self.run_once()
+
+    async def _interval_loop(self, interval_minutes: int) -> None:
+        seconds = interval_minutes * 60
+        self.logger.info("interval mode: every %d minutes", interval_minutes)
+        clock = self.state["clock"]
+        while True:
+            self.state["run_key"] = interval_run_key(clock, interval_minutes)
+            await self.run_once()
+            self.state["next_run_at"] = clock.now() + timedelta(seconds=seconds)
+            await asyncio.sleep(seconds)
+
+    async def serve(self, run_time: dt_time | None = None, interval_minutes: int | None = None) -> int:
+        if interval_minutes is not None and interval_minutes <= 0:
+            raise ValueError("interval_minutes must be > 0")
+
+        await self._open()
+        if interval_minutes is not None:
+            scheduler = self._interval_loop(interval_minutes)
+        else:
+            scheduler = self._daily_loop(run_time)
+        tasks = [
+            asyncio.create_task(coro)
+            for coro in (scheduler, self._telegram_loop(), self._heartbeat_loop(), self._notification_worker())
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            tasks.extend(self._takeovers)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._close()
+        return 0
+
+    async def once(self) -> int:
+        await self._open()
+        worker = asyncio.create_task(self._notification_worker())
+        try:
+            code = await self.run_once()
+            await self._notifications.join()
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            await self._close()
+        return code
+
+
+def run_async(
+    logger,
+    cfg: dict,
+    state: dict,
+    run_time: dt_time | None = None,
+    interval_minutes: int | None = None,
+    once: bool = False,
+) -> int:
+    runtime = AsyncRuntime(logger, cfg, state)
+    if once:
+        return asyncio.run(runtime.once())
+    return asyncio.run(runtime.serve(run_time, interval_minutes))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone, tzinfo
+
+
+class SimulationFinished(Exception):
+    pass
+
+
+class SystemClock:
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def seconds_between(self, start: datetime, end: datetime) -> float:
+        # Naive local datetimes are converted to UTC first so that a DST
+        # change between the two is counted in real elapsed seconds.
+        return (end.astimezone(timezone.utc) - start.astimezone(timezone.utc)).total_seconds()
+
+
+class VirtualClock:
+    def __init__(self, start: datetime, tz: tzinfo, until: datetime) -> None:
+        self.tz = tz
+        self._utc = self._to_utc(start)
+        self._until = self._to_utc(until)
+        self.sleep_calls = 0
+        self.slept_seconds = 0.0
+
+    def _to_utc(self, value: datetime) -> datetime:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=self.tz)
+        return value.astimezone(timezone.utc)
+
+    def utc_now(self) -> datetime:
+        return self._utc
+
+    def now(self) -> datetime:
+        return self._utc.astimezone(self.tz).replace(tzinfo=None)
+
+    def sleep(self, seconds: float) -> None:
+        seconds = max(seconds, 0.0)
+        self.sleep_calls += 1
+        self.slept_seconds += seconds
+        self._utc += timedelta(seconds=seconds)
+        if self._utc >= self._until:
+            raise SimulationFinished()
+
+    def seconds_between(self, start: datetime, end: datetime) -> float:
+        return (self._to_utc(end) - self._to_utc(start)).total_seconds()
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import socket
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -36,6 +37,22 @@ def _get_str_env(name: str, default: str) -> str:
     return value if value else default
 
 
+def _get_accounts_env(name: str) -> list[dict[str, str]]:
+    # Format: name1:token1,name2:token2
+    accounts = []
+    for item in os.getenv(name, "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if ":" not in item:
+            raise ValueError(f"{name} entries must be in name:token format")
+        account_name, token = (part.strip() for part in item.split(":", 1))
+        if not account_name or not token:
+            raise ValueError(f"{name} entries must be in name:token format")
+        accounts.append({"name": account_name, "token": token})
+    return accounts
+
+
 def load_config(require_token: bool = True) -> dict:
     env_path = _project_root() / ".env"
     load_dotenv(env_path)
@@ -46,6 +63,8 @@ def load_config(require_token: bool = True) -> dict:
 
     return {
         "account_token": account_token,
+        "account_name": _get_str_env("ACCOUNT_NAME", "default"),
+        "accounts": _get_accounts_env("ACCOUNTS"),
         "lang": _get_str_env("LANG", "zh_CN"),
         "run_time": _get_str_env("RUN_TIME", "04:00"),
         "timeout_seconds": _get_int_env("TIMEOUT_SECONDS", 5),
@@ -57,6 +76,13 @@ def load_config(require_token: bool = True) -> dict:
         "telegram_poll_time": _get_str_env("TELEGRAM_POLL_TIME", "00:00"),
         "token_fetch_url": _get_str_env("TOKEN_FETCH_URL", "https://www.leigod.com/login"),
         "token_fetch_timeout_seconds": _get_int_env("TOKEN_FETCH_TIMEOUT_SECONDS", 180),
+        "token_fetch_memory_mb": _get_int_env("TOKEN_FETCH_MEMORY_MB", 0),
+        "token_auto_refetch": _get_bool_env("TOKEN_AUTO_REFETCH", False),
+        "coordinator_db": _get_str_env("COORDINATOR_DB", ""),
+        "coordinator_node_id": _get_str_env("COORDINATOR_NODE_ID", socket.gethostname()),
+        "coordinator_lease_seconds": _get_int_env("COORDINATOR_LEASE_SECONDS", 30),
+        "engine": _get_str_env("ENGINE", "sync"),
+        "async_concurrency": _get_int_env("ASYNC_CONCURRENCY", 20),
     }
 
 
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable
+
+DEFAULT_LEASE_SECONDS = 30
+# Run claims older than this are pruned on heartbeat.
+RUN_RETENTION_SECONDS = 7 * 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leader (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    node_id TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    account TEXT NOT NULL,
+    run_key TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (account, run_key)
+);
+"""
+
+
+def _weight(node_id: str, account: str) -> int:
+    digest = hashlib.sha256(f"{node_id}\0{account}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def owner_of(account: str, nodes: Iterable[str]) -> str | None:
+    # Rendezvous hashing: when a node joins or leaves, only its own accounts move.
+    return max(nodes, key=lambda node_id: _weight(node_id, account), default=None)
+
+
+class LeaseCoordinator:
+    # A node's row expires one heartbeat interval before its lease ends, and
+    # survivors check for takeovers every interval. A dead node's accounts
+    # are therefore taken over at most lease_seconds after its last
+    # heartbeat. One missed heartbeat is still tolerated.
+
+    def __init__(
+        self,
+        db_path: str,
+        node_id: str,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS,
+        now: Callable[[], float] = time.time,
+    ) -> None:
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds must be > 0")
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.is_leader = False
+        self._now = now
+        # Shared between the engine and a heartbeat thread or asyncio.to_thread.
+        self._lock = threading.RLock()
+        # Fail a contended write quickly rather than wait past the lease.
+        self._conn = sqlite3.connect(
+            db_path,
+            timeout=self.heartbeat_interval / 4,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            # Claims this node left unfinished before a restart are released
+            # so that the account can be claimed again.
+            self._conn.execute(
+                "DELETE FROM runs WHERE node_id = ? AND status = 'claimed'",
+                (self.node_id,),
+            )
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return self.lease_seconds / 3
+
+    @property
+    def _expiry_window(self) -> float:
+        return self.lease_seconds - self.heartbeat_interval
+
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def heartbeat(self) -> bool:
+        with self._lock:
+            return self._heartbeat()
+
+    def _heartbeat(self) -> bool:
+        now = self._now()
+        expires_at = now + self._expiry_window
+        conn = self._transaction()
+        try:
+            conn.execute(
+                "INSERT INTO nodes (node_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(node_id) DO UPDATE SET expires_at = excluded.expires_at",
+                (self.node_id, expires_at),
+            )
+            conn.execute(
+                "INSERT INTO leader (id, node_id, expires_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET node_id = excluded.node_id, expires_at = excluded.expires_at "
+                "WHERE leader.node_id = excluded.node_id OR leader.expires_at <= ?",
+                (self.node_id, expires_at, now),
+            )
+            row = conn.execute("SELECT node_id FROM leader WHERE id = 1").fetchone()
+            conn.execute("DELETE FROM nodes WHERE expires_at <= ?", (now - self.lease_seconds,))
+            conn.execute("DELETE FROM runs WHERE updated_at <= ?", (now - RUN_RETENTION_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            self.is_leader = False
+            raise
+
+        self.is_leader = row is not None and row[0] == self.node_id
+        return self.is_leader
+
+    def live_nodes(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT node_id FROM nodes WHERE expires_at > ? ORDER BY node_id",
+                (self._now(),),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def finished(self, run_key: str) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT account FROM runs WHERE run_key = ? AND status != 'claimed'",
+                (run_key,),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def get_value(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_value(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    def claim(self, account: str, run_key: str) -> bool:
+        with self._lock:
+            return self._claim(account, run_key)
+
+    def _claim(self, account: str, run_key: str) -> bool:
+        now = self._now()
+        conn = self._transaction()
+        try:
+            live = [
+                row[0]
+                for row in conn.execute("SELECT node_id FROM nodes WHERE expires_at > ?", (now,))
+            ]
+            if owner_of(account, live) != self.node_id:
+                conn.execute("ROLLBACK")
+                return False
+
+            row = conn.execute(
+                "SELECT node_id, status FROM runs WHERE account = ? AND run_key = ?",
+                (account, run_key),
+            ).fetchone()
+            # Take over only claims left unfinished by a node whose lease expired.
+            # A live node's claim, including this node's own, is still in flight.
+            if row is not None and (row[1] != "claimed" or row[0] in live):
+                conn.execute("ROLLBACK")
+                return False
+
+            conn.execute(
+                "INSERT INTO runs (account, run_key, node_id, status, updated_at) VALUES (?, ?, ?, 'claimed', ?) "
+                "ON CONFLICT(account, run_key) DO UPDATE SET node_id = excluded.node_id, "
+                "status = 'claimed', updated_at = excluded.updated_at",
+                (account, run_key, self.node_id, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def complete(self, account: str, run_key: str, status: str = "done") -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE account = ? AND run_key = ? AND node_id = ?",
+                (status, self._now(), account, run_key, self.node_id),
+            )
+
+    def release(self) -> None:
+        with self._lock:
+            conn = self._transaction()
+            try:
+                conn.execute("DELETE FROM nodes WHERE node_id = ?", (self.node_id,))
+                conn.execute("DELETE FROM leader WHERE node_id = ?", (self.node_id,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.is_leader = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
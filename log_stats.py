@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import gzip
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app_logging import iter_log_files
+
+OUTCOMES = ("success", "already_paused", "expired", "failed")
+PERCENTILES = (50, 90, 99)
+DEFAULT_ACCOUNT = "default"
+# Below this total size the process pool costs more than it saves.
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+LINE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}) \d{2}:\d{2}:\d{2},\d+ [A-Z]+ (.*)$")
+TAG_RE = re.compile(r"\[account=(\S+) latency_ms=(\d+)\]\s*$")
+
+_MESSAGE_PREFIXES = (
+    ("paused successfully", "success"),
+    ("already paused:", "already_paused"),
+    ("token expired.", "expired"),
+    ("pause failed:", "failed"),
+    ("TOKEN not set.", "failed"),
+)
+
+
+def _new_summary() -> dict:
+    # Latencies are kept as millisecond histograms: memory is bounded by the
+    # request timeout, percentiles stay exact, and partial results add up.
+    return {
+        "by_day": {},
+        "by_account": {},
+        "latency": Counter(),
+        "latency_by_account": {},
+        "lines": 0,
+    }
+
+
+def _classify(message: str) -> Optional[str]:
+    for prefix, outcome in _MESSAGE_PREFIXES:
+        if message.startswith(prefix):
+            return outcome
+    return None
+
+
+def _open_log(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def _iter_records(path: Path) -> Iterator[tuple[str, str, str, Optional[int]]]:
+    with _open_log(path) as handle:
+        for line in handle:
+            match = LINE_RE.match(line)
+            if not match:
+                continue
+            day, message = match.groups()
+            outcome = _classify(message)
+            if outcome is None:
+                continue
+            tag = TAG_RE.search(message)
+            if tag:
+                yield day, outcome, tag.group(1), int(tag.group(2))
+            else:
+                # Lines written before the account/latency tag was added.
+                yield day, outcome, DEFAULT_ACCOUNT, None
+
+
+def summarize_file(path: Path) -> dict:
+    summary = _new_summary()
+    for day, outcome, account, latency_ms in _iter_records(path):
+        summary["lines"] += 1
+        summary["by_day"].setdefault(day, Counter())[outcome] += 1
+        summary["by_account"].setdefault(account, Counter())[outcome] += 1
+        if latency_ms is not None:
+            summary["latency"][latency_ms] += 1
+            summary["latency_by_account"].setdefault(account, Counter())[latency_ms] += 1
+    return summary
+
+
+def _merge(total: dict, part: dict) -> None:
+    total["lines"] += part["lines"]
+    total["latency"].update(part["latency"])
+    for key in ("by_day", "by_account", "latency_by_account"):
+        for name, counts in part[key].items():
+            total[key].setdefault(name, Counter()).update(counts)
+
+
+def summarize_logs(log_dir: Path, workers: Optional[int] = None) -> dict:
+    files = iter_log_files(log_dir)
+    total = _new_summary()
+    total["files"] = len(files)
+
+    if workers is None:
+        total_bytes = sum(path.stat().st_size for path in files)
+        workers = (os.cpu_count() or 1) if total_bytes >= PARALLEL_MIN_BYTES else 1
+    workers = max(1, min(workers, len(files)))
+
+    if workers == 1:
+        for path in files:
+            _merge(total, summarize_file(path))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(summarize_file, files):
+            _merge(total, part)
+    return total
+
+
+def percentile(histogram: Counter, pct: float) -> Optional[int]:
+    count = sum(histogram.values())
+    if not count:
+        return None
+    rank = max(1, -(-count * pct // 100))
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= rank:
+            return value
+    return None
+
+
+def _format_counts(name: str, counts: Counter, width: int) -> str:
+    total = sum(counts[outcome] for outcome in OUTCOMES)
+    ok = counts["success"] + counts["already_paused"]
+    rate = f"{ok * 100 / total:.1f}" if total else "-"
+    cells = " ".join(f"{counts[outcome]:>14}" for outcome in OUTCOMES)
+    return f"{name:<{width}} {cells} {total:>7} {rate:>6}"
+
+
+def _format_latency(histogram: Counter) -> str:
+    values = [percentile(histogram, pct) for pct in PERCENTILES]
+    return " ".join(f"{'-' if value is None else value:>8}" for value in values)
+
+
+def format_summary(summary: dict) -> str:
+    header_cells = " ".join(f"{outcome:>14}" for outcome in OUTCOMES)
+    latency_header = " ".join(f"{f'p{pct}_ms':>8}" for pct in PERCENTILES)
+
+    lines = [f"files: {summary.get('files', 0)}  pause results: {summary['lines']}", ""]
+    lines.append(f"{'day':<12} {header_cells} {'total':>7} {'ok%':>6}")
+    for day in sorted(summary["by_day"]):
+        lines.append(_format_counts(day, summary["by_day"][day], 12))
+
+    width = max([len("account")] + [len(name) for name in summary["by_account"]])
+    lines.append("")
+    lines.append(f"{'account':<{width}} {header_cells} {'total':>7} {'ok%':>6} {latency_header}")
+    for account in sorted(summary["by_account"]):
+        latency = summary["latency_by_account"].get(account, Counter())
+        lines.append(
+            f"{_format_counts(account, summary['by_account'][account], width)} {_format_latency(latency)}"
+        )
+
+    lines.append("")
+    lines.append(f"latency (all accounts): {latency_header}")
+    lines.append(f"{'':<24} {_format_latency(summary['latency'])}")
+    return "\n".join(lines)
@@ -4,48 +4,40 @@ import argparse
 import atexit
 import os
 import signal
+import sqlite3
 import sys
+import threading
 from datetime import datetime, time as dt_time, timedelta
-import time
+from pathlib import Path
 
 import portalocker
 
-from api.client import pause
-from app_logging import get_logger, setup_logging
+from app_logging import get_log_dir, get_logger, setup_logging
 from config.config import load_config, update_env_vars
+from coordinator import LeaseCoordinator
+from log_stats import format_summary, summarize_logs
+from runner import (
+    claim_accounts,
+    execute_pause,
+    fetch_token,
+    finish_account,
+    interval_run_key,
+    new_state,
+    parse_run_time,
+    parse_time_value,
+    publish_shared_token,
+    remember_shared_token,
+    renew_lease,
+    seconds_until,
+    sync_shared_token,
+    takeover_due,
+)
+from telegram_commands import TELEGRAM_COMMANDS, accept_updates, prepare_telegram_poll, run_command
 from telegram_notify import get_updates, send_telegram_message
-from token_fetcher import fetch_token_with_browser
 
 
 LOCK_HANDLE = None
-
-
-def _parse_time_value(value: str, name: str) -> dt_time:
-    try:
-        return datetime.strptime(value, "%H:%M").time()
-    except ValueError as exc:
-        raise ValueError(f"{name} must be in HH:MM 24-hour format") from exc
-
-
-def _parse_run_time(value: str) -> dt_time:
-    return _parse_time_value(value, "RUN_TIME")
-
-
-def _seconds_until(target_time: dt_time) -> tuple[float, datetime]:
-    now = datetime.now()
-    target = datetime.combine(now.date(), target_time)
-    if target <= now:
-        target += timedelta(days=1)
-    return (target - now).total_seconds(), target
-
-
-def _pause_with_token(logger, cfg: dict, token: str) -> dict:
-    return pause(
-        token,
-        cfg["lang"],
-        base_url=cfg["base_url"],
-        timeout_seconds=cfg["timeout_seconds"],
-    )
+ENGINES = ("sync", "async")
 
 
 def _notify(logger, cfg: dict, message: str) -> None:
@@ -68,12 +60,10 @@ def _notify(logger, cfg: dict, message: str) -> None:
 
 
 def _poll_telegram_for_token(logger, cfg: dict, state: dict) -> None:
-    if not cfg.get("telegram_enabled"):
-        return
-    bot_token = cfg.get("telegram_bot_token", "")
-    chat_id = cfg.get("telegram_chat_id", "")
-    if not bot_token or not chat_id:
+    prepared = prepare_telegram_poll(logger, cfg, state)
+    if prepared is None:
         return
+    bot_token, chat_id = prepared
 
     offset = state.get("offset")
     try:
@@ -82,116 +72,144 @@ def _poll_telegram_for_token(logger, cfg: dict, state: dict) -> None:
         logger.warning("telegram getUpdates failed: %s", exc)
         return
 
-    if not resp.get("ok"):
-        logger.warning("telegram getUpdates returned ok=false")
+    commands, notices = accept_updates(logger, state, resp, chat_id)
+    if not commands and not notices:
         return
 
-    updates = resp.get("result", [])
-    if not updates:
-        return
+    replies = [
+        run_command(logger, cfg, state, name, commands[name])
+        for name in TELEGRAM_COMMANDS
+        if name in commands
+    ]
+    replies.extend(notices)
 
-    max_update_id = None
-    for update in updates:
-        update_id = update.get("update_id")
-        if update_id is not None:
-            max_update_id = update_id if max_update_id is None else max(max_update_id, update_id)
+    _notify(logger, cfg, "\n\n".join(replies))
 
-        message = update.get("message") or update.get("edited_message")
-        if not message:
-            continue
 
-        from_chat_id = str(message.get("chat", {}).get("id", ""))
-        if from_chat_id != str(chat_id):
-            continue
+def _start_lease_renewal(logger, coordinator) -> threading.Event:
+    # The sync engine blocks for a whole run (and up to a browser re-fetch),
+    # which can outlast the lease, so the lease is renewed from a thread.
+    stop = threading.Event()
 
-        text = (message.get("text") or "").strip()
-        if not text:
-            continue
+    def _renew() -> None:
+        while not stop.wait(coordinator.heartbeat_interval):
+            renew_lease(logger, coordinator)
 
-        if text.startswith("/token"):
-            parts = text.split(maxsplit=1)
-            if len(parts) < 2 or not parts[1].strip():
-                _notify(logger, cfg, "Usage: /token <new_token>")
-                continue
+    threading.Thread(target=_renew, name="lease-renewal", daemon=True).start()
+    return stop
 
-            new_token = parts[1].strip()
-            update_env_vars({"TOKEN": new_token})
-            cfg["account_token"] = new_token
-            logger.info("token updated via telegram")
-            now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            _notify(logger, cfg, f"TOKEN updated at {now_str}.")
 
-    if max_update_id is not None:
-        state["offset"] = max_update_id + 1
+def _coordinator_tick(logger, cfg: dict, state: dict) -> None:
+    if takeover_due(cfg, state):
+        _run_once(logger, cfg, state)
+    else:
+        sync_shared_token(logger, cfg, state)
 
 
 def _sleep_with_poll(logger, cfg: dict, total_seconds: float, state: dict) -> None:
-    if not cfg.get("telegram_enabled"):
-        time.sleep(total_seconds)
+    clock = state["clock"]
+    coordinator = state.get("coordinator")
+    telegram_enabled = bool(cfg.get("telegram_enabled"))
+    if not telegram_enabled and coordinator is None:
+        clock.sleep(total_seconds)
         return
 
-    poll_seconds = int(cfg.get("telegram_poll_seconds", 0))
+    poll_seconds = int(cfg.get("telegram_poll_seconds", 0)) if telegram_enabled else 0
     poll_time_value = cfg.get("telegram_poll_time", "")
     poll_time = None
-    if poll_time_value and poll_seconds <= 0:
+    if telegram_enabled and poll_time_value and poll_seconds <= 0:
         try:
-            poll_time = _parse_time_value(poll_time_value, "TELEGRAM_POLL_TIME")
+            poll_time = parse_time_value(poll_time_value, "TELEGRAM_POLL_TIME")
         except ValueError as exc:
             logger.warning("invalid TELEGRAM_POLL_TIME: %s", exc)
             poll_time = None
 
     next_poll_at = None
     if poll_time:
-        now = datetime.now()
+        now = clock.now()
         next_poll_at = datetime.combine(now.date(), poll_time)
         if next_poll_at <= now:
             next_poll_at += timedelta(days=1)
 
+    def _timed(step) -> float:
+        # A tick can run a whole takeover and a poll can run /pause, so the
+        # time they take comes off the countdown to keep the run on time.
+        started = clock.now()
+        step(logger, cfg, state)
+        return max(0.0, clock.seconds_between(started, clock.now()))
+
+    # Timers are tracked as marks on the countdown so that interleaved poll
+    # and heartbeat steps land exactly on their due points.
     remaining = total_seconds
+    poll_mark = remaining - poll_seconds if poll_seconds > 0 else None
+    heartbeat_mark = remaining - coordinator.heartbeat_interval if coordinator is not None else None
     while remaining > 0:
-        step = remaining
+        wake_at = 0.0
 
         if next_poll_at is not None:
-            now = datetime.now()
-            seconds_until_poll = (next_poll_at - now).total_seconds()
+            now = clock.now()
+            seconds_until_poll = clock.seconds_between(now, next_poll_at)
             if seconds_until_poll <= 0:
-                _poll_telegram_for_token(logger, cfg, state)
+                remaining -= _timed(_poll_telegram_for_token)
                 next_poll_at += timedelta(days=1)
                 continue
-            step = min(step, seconds_until_poll)
-        elif poll_seconds > 0:
-            step = min(step, poll_seconds)
+            wake_at = max(wake_at, remaining - seconds_until_poll)
+        elif poll_mark is not None:
+            wake_at = max(wake_at, poll_mark)
+        if heartbeat_mark is not None:
+            wake_at = max(wake_at, heartbeat_mark)
 
-        time.sleep(step)
-        remaining -= step
+        clock.sleep(remaining - wake_at)
+        remaining = wake_at
+
+        if heartbeat_mark is not None and remaining <= heartbeat_mark:
+            remaining -= _timed(_coordinator_tick)
+            heartbeat_mark = remaining - coordinator.heartbeat_interval
 
         if next_poll_at is not None:
-            now = datetime.now()
+            now = clock.now()
             if now >= next_poll_at:
-                _poll_telegram_for_token(logger, cfg, state)
+                remaining -= _timed(_poll_telegram_for_token)
                 next_poll_at += timedelta(days=1)
-        elif poll_seconds > 0:
-            _poll_telegram_for_token(logger, cfg, state)
+        elif poll_mark is not None and (remaining <= poll_mark or remaining <= 0):
+            remaining -= _timed(_poll_telegram_for_token)
+            poll_mark = remaining - poll_seconds
 
 
 def _fetch_token_interactive(logger, cfg: dict) -> int:
     logger.info("opening browser to fetch token")
     try:
-        token = fetch_token_with_browser(
-            cfg["token_fetch_url"],
-            timeout_seconds=cfg["token_fetch_timeout_seconds"],
-        )
+        fetch_token(logger, cfg)
     except Exception as exc:
         logger.error("failed to fetch token: %s", exc)
         _notify(logger, cfg, f"Token fetch failed: {exc}")
         return 1
 
-    update_env_vars({"TOKEN": token})
-    cfg["account_token"] = token
-    logger.info("token fetched and saved to .env")
+    _share_fetched_token(logger, cfg)
     _notify(logger, cfg, "Token fetched and saved.")
     return 0
 
+
+def _share_fetched_token(logger, cfg: dict) -> None:
+    # --fetch-token runs without the daemon's coordinator. Publishing here
+    # lets running nodes pick the new token up.
+    if not cfg.get("coordinator_db"):
+        return
+    try:
+        coordinator = LeaseCoordinator(
+            cfg["coordinator_db"],
+            cfg["coordinator_node_id"],
+            lease_seconds=cfg["coordinator_lease_seconds"],
+        )
+    except (sqlite3.Error, ValueError) as exc:
+        logger.warning("coordinator error: %s", exc)
+        return
+    try:
+        publish_shared_token(logger, new_state(coordinator=coordinator), cfg["account_token"])
+    finally:
+        coordinator.close()
+
+
 def _ensure_telegram_config(logger, cfg: dict) -> bool:
     if not cfg.get("telegram_enabled"):
         return True
@@ -227,66 +245,76 @@ def _ensure_telegram_config(logger, cfg: dict) -> bool:
     return True
 
 
-def _run_once(logger, cfg: dict) -> int:
-    token = cfg["account_token"]
-    if not token:
-        logger.error("TOKEN not set. Please update .env and try again.")
-        return 1
+def _run_once(logger, cfg: dict, state: dict | None = None) -> int:
+    accounts, labelled, exit_code = claim_accounts(logger, cfg, state)
+    for account_cfg in accounts:
+        code, message = execute_pause(logger, account_cfg, state)
+        notice = finish_account(logger, state, account_cfg, code, message, labelled)
+        if notice:
+            _notify(logger, cfg, notice)
+        exit_code = max(exit_code, code)
+    return exit_code
 
-    try:
-        resp = _pause_with_token(logger, cfg, token)
-    except Exception as exc:
-        logger.error("pause failed: %s", exc)
-        _notify(logger, cfg, f"Pause failed: {exc}")
-        return 1
-
-    code = resp.get("code")
-    msg = resp.get("msg")
-
-    if code == 400006:
-        logger.error("token expired. Please update TOKEN in .env and retry.")
-        _notify(logger, cfg, "Token expired. Please update TOKEN.")
-        return 1
-
-    if code == 0:
-        logger.info("%s:%s", code, msg)
-        logger.info("paused successfully")
-        _notify(logger, cfg, "Pause successful.")
-        return 0
 
-    if code == 400803:
-        logger.info("already paused: %s - %s", code, msg)
-        # _notify(logger, cfg, "Already paused.")
-        return 0
-
-    logger.error("pause failed: %s - %s", code, msg)
-    _notify(logger, cfg, f"Pause failed: {code} - {msg}")
-    return 1
-
-
-def run_loop(logger, cfg: dict, run_time: dt_time) -> int:
-    poll_state = {"offset": None}
+def run_loop(logger, cfg: dict, run_time: dt_time, state: dict | None = None) -> int:
+    poll_state = state if state is not None else new_state()
 
     while True:
-        seconds, target = _seconds_until(run_time)
+        seconds, target = seconds_until(run_time, poll_state["clock"])
+        poll_state["next_run_at"] = target
         logger.info("next run scheduled at %s", target.strftime("%Y-%m-%d %H:%M:%S"))
         _sleep_with_poll(logger, cfg, seconds, poll_state)
-        _run_once(logger, cfg)
+        poll_state["run_key"] = target.strftime("%Y-%m-%d %H:%M")
+        _run_once(logger, cfg, poll_state)
 
 
-def run_interval_loop(logger, cfg: dict, interval_minutes: int) -> int:
+def run_interval_loop(logger, cfg: dict, interval_minutes: int, state: dict | None = None) -> int:
     if interval_minutes <= 0:
         raise ValueError("interval_minutes must be > 0")
 
     seconds = interval_minutes * 60
     logger.info("interval mode: every %d minutes", interval_minutes)
-    poll_state = {"offset": None}
+    poll_state = state if state is not None else new_state()
 
     while True:
-        _run_once(logger, cfg)
+        poll_state["run_key"] = interval_run_key(poll_state["clock"], interval_minutes)
+        _run_once(logger, cfg, poll_state)
+        poll_state["next_run_at"] = poll_state["clock"].now() + timedelta(seconds=seconds)
         _sleep_with_poll(logger, cfg, seconds, poll_state)
 
 
+def _create_coordinator(logger, cfg: dict, renew_in_background: bool = True):
+    if not cfg.get("coordinator_db"):
+        return None
+
+    coordinator = LeaseCoordinator(
+        cfg["coordinator_db"],
+        cfg["coordinator_node_id"],
+        lease_seconds=cfg["coordinator_lease_seconds"],
+    )
+    coordinator.heartbeat()
+    logger.info(
+        "coordinator: node %s joined %s (leader: %s)",
+        coordinator.node_id,
+        cfg["coordinator_db"],
+        "yes" if coordinator.is_leader else "no",
+    )
+
+    stop_renewal = _start_lease_renewal(logger, coordinator) if renew_in_background else None
+
+    def _cleanup() -> None:
+        if stop_renewal is not None:
+            stop_renewal.set()
+        try:
+            coordinator.release()
+            coordinator.close()
+        except sqlite3.Error:
+            return
+
+    atexit.register(_cleanup)
+    return coordinator
+
+
 def setup_signal_handlers(logger) -> None:
     def _handle_stop(signum, _frame):
         logger.info("received signal %s, exiting", signum)
@@ -396,10 +424,47 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Open browser to fetch TOKEN and save to .env",
     )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=None,
+        help="Execution engine (overrides ENGINE in .env; async requires aiohttp)",
+    )
+    parser.add_argument(
+        "--log-stats",
+        action="store_true",
+        help="Summarize pause results and latency from current and rotated logs, then exit",
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=None,
+        help="Log directory for --log-stats (defaults to LOG_DIR)",
+    )
+    parser.add_argument(
+        "--log-workers",
+        type=int,
+        default=None,
+        help="Worker processes for --log-stats (default: automatic by log size)",
+    )
     return parser.parse_args()
 
 
+def _print_log_stats(args: argparse.Namespace) -> int:
+    log_dir = Path(args.log_dir) if args.log_dir else get_log_dir()
+    if not log_dir.is_dir():
+        print(f"log directory not found: {log_dir}", file=sys.stderr)
+        return 1
+    print(format_summary(summarize_logs(log_dir, workers=args.log_workers)))
+    return 0
+
+
 def main() -> int:
+    args = parse_args()
+
+    # Read-only: must not take the instance lock held by a running daemon.
+    if args.log_stats:
+        return _print_log_stats(args)
+
     setup_logging()
     logger = get_logger()
 
@@ -408,8 +473,6 @@ def main() -> int:
     acquire_lock(logger)
     write_pid_file(logger)
 
-    args = parse_args()
-
     try:
         cfg = load_config(require_token=False)
     except Exception as exc:
@@ -422,15 +485,43 @@ def main() -> int:
     if args.fetch_token:
         return _fetch_token_interactive(logger, cfg)
 
+    engine = args.engine or cfg["engine"]
+    if engine not in ENGINES:
+        logger.error("config error: ENGINE must be one of %s", ", ".join(ENGINES))
+        return 1
+    if engine == "async":
+        # Imported lazily so the default engine does not need aiohttp.
+        try:
+            from async_runtime import run_async
+        except ImportError as exc:
+            logger.error("config error: ENGINE=async requires aiohttp (%s)", exc)
+            return 1
+
     if args.once:
+        if engine == "async":
+            return run_async(logger, cfg, new_state(), once=True)
         return _run_once(logger, cfg)
 
-    if args.interval_minutes is not None:
-        return run_interval_loop(logger, cfg, args.interval_minutes)
+    try:
+        # The async engine renews the lease from its own heartbeat task.
+        coordinator = _create_coordinator(logger, cfg, renew_in_background=engine != "async")
+    except (sqlite3.Error, ValueError) as exc:
+        logger.error("coordinator error: %s", exc)
+        return 1
+    state = new_state(coordinator=coordinator)
+    remember_shared_token(logger, state)
+
+    run_time = None
+    if args.interval_minutes is None:
+        run_time_value = args.run_time or cfg["run_time"]
+        run_time = parse_run_time(run_time_value)
 
-    run_time_value = args.run_time or cfg["run_time"]
-    run_time = _parse_run_time(run_time_value)
-    return run_loop(logger, cfg, run_time)
+    if engine == "async":
+        return run_async(logger, cfg, state, run_time=run_time, interval_minutes=args.interval_minutes)
+
+    if args.interval_minutes is not None:
+        return run_interval_loop(logger, cfg, args.interval_minutes, state)
+    return run_loop(logger, cfg, run_time, state)
 
 
 if __name__ == "__main__":
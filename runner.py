@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from api.client import pause
+from clock import SYSTEM_CLOCK
+from config.config import update_env_vars
+from coordinator import owner_of
+from token_fetcher import fetch_token_in_subprocess
+
+TOKEN_EXPIRED_MESSAGE = "Token expired. Please update TOKEN."
+# Shared-store key holding the current TOKEN when several nodes coordinate.
+SHARED_TOKEN_KEY = "token"
+
+
+def parse_time_value(value: str, name: str) -> dt_time:
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except ValueError as exc:
+        raise ValueError(f"{name} must be in HH:MM 24-hour format") from exc
+
+
+def parse_run_time(value: str) -> dt_time:
+    return parse_time_value(value, "RUN_TIME")
+
+
+def seconds_until(target_time: dt_time, clock=SYSTEM_CLOCK) -> tuple[float, datetime]:
+    now = clock.now()
+    target = datetime.combine(now.date(), target_time)
+    if target <= now:
+        target += timedelta(days=1)
+    return clock.seconds_between(now, target), target
+
+
+def interval_run_key(clock, interval_minutes: int) -> str:
+    # Nodes started at different times still agree on the interval slot.
+    slot = int(clock.now().timestamp() // (interval_minutes * 60))
+    return f"every-{interval_minutes}m-{slot}"
+
+
+def new_state(clock=SYSTEM_CLOCK, coordinator=None) -> dict:
+    return {
+        "clock": clock,
+        "coordinator": coordinator,
+        "run_key": None,
+        "offset": None,
+        "started_at": clock.now(),
+        "next_run_at": None,
+        "last_result": None,
+        # The shared TOKEN as this node last saw it; see sync_shared_token.
+        "shared_token": None,
+        "stats": {
+            "success": 0,
+            "already_paused": 0,
+            "expired": 0,
+            "failed": 0,
+            "token_updates": 0,
+            "telegram_batches": 0,
+        },
+    }
+
+
+def record_result(state: dict | None, outcome: str, detail: str) -> None:
+    if state is None:
+        return
+    state["stats"][outcome] += 1
+    state["last_result"] = {
+        "outcome": outcome,
+        "detail": detail,
+        "at": state["clock"].now(),
+    }
+
+
+def publish_shared_token(logger, state: dict | None, token: str) -> None:
+    # Only the leader reads Telegram and any node may re-fetch, so a new
+    # TOKEN goes to the shared store for whichever node owns the account.
+    coordinator = state.get("coordinator") if state else None
+    if coordinator is None:
+        return
+    try:
+        coordinator.set_value(SHARED_TOKEN_KEY, token)
+    except sqlite3.Error as exc:
+        logger.warning("coordinator write failed: %s", exc)
+        return
+    state["shared_token"] = token
+
+
+def _read_shared_token(logger, state: dict | None) -> tuple[bool, str | None]:
+    coordinator = state.get("coordinator") if state else None
+    if coordinator is None:
+        return False, None
+    try:
+        return True, coordinator.get_value(SHARED_TOKEN_KEY)
+    except sqlite3.Error as exc:
+        logger.warning("coordinator read failed: %s", exc)
+        return False, None
+
+
+def remember_shared_token(logger, state: dict) -> None:
+    # At startup the node keeps the TOKEN in its own .env. Only tokens
+    # published after this point are applied.
+    ok, token = _read_shared_token(logger, state)
+    if ok:
+        state["shared_token"] = token
+
+
+def sync_shared_token(logger, cfg: dict, state: dict | None) -> None:
+    # Only a TOKEN published since this node last looked is applied, so a
+    # stale shared value never replaces a newer token from --fetch-token or
+    # an edited .env.
+    ok, token = _read_shared_token(logger, state)
+    if not ok:
+        return
+    seen = state["shared_token"]
+    state["shared_token"] = token
+    if token and token != seen and token != cfg["account_token"]:
+        update_env_vars({"TOKEN": token})
+        cfg["account_token"] = token
+        logger.info("token updated from shared store")
+
+
+def renew_lease(logger, coordinator) -> bool:
+    was_leader = coordinator.is_leader
+    try:
+        is_leader = coordinator.heartbeat()
+    except sqlite3.Error as exc:
+        logger.warning("coordinator heartbeat failed: %s", exc)
+        return False
+    if is_leader != was_leader:
+        logger.info("node %s %s leadership", coordinator.node_id, "acquired" if is_leader else "lost")
+    return True
+
+
+def takeover_due(cfg: dict, state: dict) -> bool:
+    # The last run is re-checked for accounts whose owner's lease expired.
+    return bool(state.get("run_key")) and bool(account_configs(cfg))
+
+
+def fetch_token(logger, cfg: dict) -> str:
+    # The browser runs in a separate process so Playwright and Chromium never
+    # load into the daemon, and a hung browser is killed instead of blocking it.
+    token = fetch_token_in_subprocess(
+        cfg["token_fetch_url"],
+        timeout_seconds=cfg["token_fetch_timeout_seconds"],
+        memory_limit_mb=cfg["token_fetch_memory_mb"],
+    )
+    update_env_vars({"TOKEN": token})
+    cfg["account_token"] = token
+    logger.info("token fetched and saved to .env")
+    return token
+
+
+def refetch_expired_token(logger, cfg: dict, state: dict | None) -> bool:
+    logger.info("token expired, opening browser to fetch a new one")
+    try:
+        fetch_token(logger, cfg)
+    except Exception as exc:
+        logger.error("automatic token fetch failed: %s", exc)
+        return False
+    publish_shared_token(logger, state, cfg["account_token"])
+    if state is not None:
+        state["stats"]["token_updates"] += 1
+    return True
+
+
+def pause_log_tag(cfg: dict, started: float) -> str:
+    # Parsed back by log_stats; keep the format in sync with log_stats.TAG_RE.
+    latency_ms = int((time.perf_counter() - started) * 1000)
+    return f"[account={cfg.get('account_name', 'default')} latency_ms={latency_ms}]"
+
+
+def pause_error(logger, cfg: dict, state: dict | None, exc: Exception, started: float) -> tuple[int, str]:
+    logger.error("pause failed: %s %s", exc, pause_log_tag(cfg, started))
+    record_result(state, "failed", str(exc))
+    return 1, f"Pause failed: {exc}"
+
+
+def handle_pause_response(
+    logger,
+    cfg: dict,
+    state: dict | None,
+    resp: dict,
+    started: float,
+    allow_refetch: bool,
+) -> tuple[int, str | None] | None:
+    # Returns None when the token expired and the caller should re-fetch it.
+    tag = pause_log_tag(cfg, started)
+    code = resp.get("code")
+    msg = resp.get("msg")
+
+    if code == 400006:
+        if allow_refetch and cfg.get("token_auto_refetch"):
+            # Not an outcome: only the retry's result is logged and counted.
+            logger.warning("re-fetching expired token via browser %s", tag)
+            return None
+        return token_expired(logger, state, f"{code} - {msg}", tag)
+
+    if code == 0:
+        logger.info("%s:%s", code, msg)
+        logger.info("paused successfully %s", tag)
+        record_result(state, "success", f"{code} - {msg}")
+        return 0, "Pause successful."
+
+    if code == 400803:
+        logger.info("already paused: %s - %s %s", code, msg, tag)
+        record_result(state, "already_paused", f"{code} - {msg}")
+        return 0, None
+
+    logger.error("pause failed: %s - %s %s", code, msg, tag)
+    record_result(state, "failed", f"{code} - {msg}")
+    return 1, f"Pause failed: {code} - {msg}"
+
+
+def token_expired(logger, state: dict | None, detail: str, tag: str) -> tuple[int, str]:
+    logger.error("token expired. Please update TOKEN in .env and retry. %s", tag)
+    record_result(state, "expired", detail)
+    return 1, TOKEN_EXPIRED_MESSAGE
+
+
+def refetched_result(code: int, message: str | None) -> tuple[int, str]:
+    prefix = "Token expired and was re-fetched."
+    return code, f"{prefix} {message}" if message else prefix
+
+
+def missing_token(logger, state: dict | None) -> tuple[int, str]:
+    logger.error("TOKEN not set. Please update .env and try again.")
+    record_result(state, "failed", "TOKEN not set")
+    return 1, "TOKEN not set."
+
+
+def send_pause(cfg: dict, token: str) -> dict:
+    return pause(
+        token,
+        cfg["lang"],
+        base_url=cfg["base_url"],
+        timeout_seconds=cfg["timeout_seconds"],
+    )
+
+
+def execute_pause(
+    logger,
+    cfg: dict,
+    state: dict | None = None,
+    allow_refetch: bool = True,
+    send=send_pause,
+) -> tuple[int, str | None]:
+    # send(cfg, token) makes the pause request; the async engine passes one
+    # that goes through its aiohttp session.
+    token = cfg["account_token"]
+    if not token:
+        return missing_token(logger, state)
+
+    started = time.perf_counter()
+    try:
+        resp = send(cfg, token)
+    except Exception as exc:
+        return pause_error(logger, cfg, state, exc, started)
+
+    result = handle_pause_response(logger, cfg, state, resp, started, allow_refetch)
+    if result is not None:
+        return result
+
+    tag = pause_log_tag(cfg, started)
+    if refetch_expired_token(logger, cfg, state):
+        return refetched_result(*execute_pause(logger, cfg, state, allow_refetch=False, send=send))
+    return token_expired(logger, state, "400006 - automatic re-fetch failed", tag)
+
+
+def account_configs(cfg: dict) -> list[dict]:
+    # The TOKEN account uses cfg itself so /token and re-fetches apply to it;
+    # ACCOUNTS entries get a copy that never writes back to .env.
+    configs = [cfg] if cfg["account_token"] else []
+    for account in cfg.get("accounts", []):
+        configs.append(
+            {
+                **cfg,
+                "account_name": account["name"],
+                "account_token": account["token"],
+                "token_auto_refetch": False,
+            }
+        )
+    return configs
+
+
+def claim_accounts(logger, cfg: dict, state: dict | None) -> tuple[list[dict], bool, int]:
+    # Returns the accounts this node pauses in the current run, whether their
+    # notifications need an account label, and the exit code so far.
+    sync_shared_token(logger, cfg, state)
+    accounts = account_configs(cfg)
+    if not accounts:
+        return [], False, missing_token(logger, state)[0]
+    labelled = len(accounts) > 1
+
+    coordinator = state.get("coordinator") if state else None
+    if coordinator is None:
+        return accounts, labelled, 0
+
+    run_key = state.get("run_key")
+    try:
+        finished = coordinator.finished(run_key)
+        live = coordinator.live_nodes()
+    except sqlite3.Error as exc:
+        logger.warning("coordinator read failed: %s", exc)
+        return [], labelled, 1
+
+    claimed = []
+    exit_code = 0
+    for account_cfg in accounts:
+        name = account_cfg.get("account_name", "default")
+        # claim() takes the write lock on the shared file, so accounts that
+        # are done or owned by another node are skipped with plain reads.
+        # claim() checks ownership again under the lock.
+        if name in finished or owner_of(name, live) != coordinator.node_id:
+            continue
+        try:
+            if coordinator.claim(name, run_key):
+                claimed.append(account_cfg)
+        except sqlite3.Error as exc:
+            logger.warning("coordinator claim failed for %s: %s", name, exc)
+            exit_code = 1
+    return claimed, labelled, exit_code
+
+
+def finish_account(
+    logger,
+    state: dict | None,
+    account_cfg: dict,
+    code: int,
+    message: str | None,
+    labelled: bool,
+) -> str | None:
+    # Marks a claimed account done and returns its notification, if any.
+    name = account_cfg.get("account_name", "default")
+    coordinator = state.get("coordinator") if state else None
+    if coordinator is not None:
+        try:
+            coordinator.complete(name, state.get("run_key"), "done" if code == 0 else "failed")
+        except sqlite3.Error as exc:
+            logger.warning("coordinator update failed for %s: %s", name, exc)
+    if not message:
+        return None
+    return f"[{name}] {message}" if labelled else message
+
+
+def pause_targets(cfg: dict) -> list[dict]:
+    # An explicit /pause covers every account, regardless of sharding.
+    return account_configs(cfg) or [cfg]
+
+
+def format_pause_replies(accounts: list[dict], results: list[tuple[int, str | None]]) -> str:
+    if len(accounts) == 1:
+        return results[0][1] or "Already paused."
+    return "\n".join(
+        f"[{account_cfg['account_name']}] {message or 'Already paused.'}"
+        for account_cfg, (_, message) in zip(accounts, results)
+    )
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import argparse
+import logging as std_logging
+import math
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo
+
+import main as app
+import runner
+import telegram_commands
+from clock import SimulationFinished, VirtualClock
+
+
+def _quiet_logger() -> std_logging.Logger:
+    logger = std_logging.getLogger("leishen_auto_simulation")
+    if not logger.handlers:
+        logger.addHandler(std_logging.NullHandler())
+        logger.propagate = False
+    return logger
+
+
+class _StubIO:
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+        self.pause_at: list[datetime] = []
+        self.get_updates_calls = 0
+        self.send_calls = 0
+        self.env_writes = 0
+
+    def pause(self, *args, **kwargs) -> dict:
+        self.pause_at.append(self.clock.utc_now())
+        return {"code": 0, "msg": "simulated"}
+
+    def get_updates(self, *args, **kwargs) -> dict:
+        self.get_updates_calls += 1
+        return {"ok": True, "result": []}
+
+    def send_telegram_message(self, *args, **kwargs) -> dict:
+        self.send_calls += 1
+        return {"ok": True}
+
+    def update_env_vars(self, values: dict) -> None:
+        self.env_writes += 1
+
+
+# Each stubbed function is patched in every module that looks it up.
+_STUBBED = (
+    (runner, "pause"),
+    (runner, "update_env_vars"),
+    (telegram_commands, "update_env_vars"),
+    (app, "get_updates"),
+    (app, "send_telegram_message"),
+    (app, "update_env_vars"),
+)
+
+
+@contextmanager
+def _stubbed_io(stub: _StubIO):
+    originals = [(module, name, getattr(module, name)) for module, name in _STUBBED]
+    for module, name in _STUBBED:
+        setattr(module, name, getattr(stub, name))
+    try:
+        yield
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+
+def _local_to_utc(day: date, run_time: dt_time, tz: tzinfo) -> datetime:
+    return datetime.combine(day, run_time).replace(tzinfo=tz).astimezone(timezone.utc)
+
+
+def _expected_daily_fires(run_time: dt_time, tz: tzinfo, start: datetime, end: datetime) -> list[datetime]:
+    fires = []
+    day = start.astimezone(tz).date()
+    while True:
+        fire = _local_to_utc(day, run_time, tz)
+        if fire >= end:
+            return fires
+        if fire > start:
+            fires.append(fire)
+        day += timedelta(days=1)
+
+
+def _fire_errors(actual: list[datetime], expected: list[datetime]) -> list[float]:
+    errors = []
+    for fire in actual:
+        nearest = min(expected, key=lambda value: abs((fire - value).total_seconds()), default=None)
+        if nearest is not None:
+            errors.append((fire - nearest).total_seconds())
+    return errors
+
+
+def _interval_errors(actual: list[datetime], interval_minutes: int) -> list[float]:
+    interval = interval_minutes * 60
+    return [(b - a).total_seconds() - interval for a, b in zip(actual, actual[1:])]
+
+
+def simulate_schedule(
+    start: datetime,
+    days: int,
+    tz: tzinfo,
+    run_time: str | None = None,
+    interval_minutes: int | None = None,
+    poll_seconds: int = 0,
+    poll_time: str = "00:00",
+) -> dict:
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=tz)
+    end = start + timedelta(days=days)
+    clock = VirtualClock(start, tz, end)
+    stub = _StubIO(clock)
+    logger = _quiet_logger()
+    cfg = {
+        "account_token": "simulated-token",
+        "lang": "zh_CN",
+        "base_url": "http://simulation.invalid",
+        "timeout_seconds": 5,
+        "telegram_enabled": True,
+        "telegram_bot_token": "simulated-bot",
+        "telegram_chat_id": "0",
+        "telegram_poll_seconds": poll_seconds,
+        "telegram_poll_time": poll_time,
+        "token_auto_refetch": False,
+    }
+    state = runner.new_state(clock)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    with _stubbed_io(stub):
+        try:
+            if interval_minutes is not None:
+                app.run_interval_loop(logger, cfg, interval_minutes, state)
+            else:
+                app.run_loop(logger, cfg, runner.parse_run_time(run_time), state)
+        except SimulationFinished:
+            pass
+    cpu_seconds = time.process_time() - cpu_start
+    wall_seconds = time.perf_counter() - wall_start
+
+    if interval_minutes is not None:
+        schedule = f"every {interval_minutes}m"
+        # The interval loop fires at the start and then every interval until
+        # the simulated span ends. The span is measured in UTC because a DST
+        # change makes `days` local days an hour longer or shorter.
+        span_seconds = (end.astimezone(timezone.utc) - start.astimezone(timezone.utc)).total_seconds()
+        expected_count = math.ceil(span_seconds / (interval_minutes * 60))
+        errors = _interval_errors(stub.pause_at, interval_minutes)
+    else:
+        schedule = f"daily {run_time}"
+        expected = _expected_daily_fires(runner.parse_run_time(run_time), tz, start.astimezone(timezone.utc), end.astimezone(timezone.utc))
+        expected_count = len(expected)
+        errors = _fire_errors(stub.pause_at, expected)
+
+    return {
+        "schedule": schedule,
+        "fires": len(stub.pause_at),
+        "expected_fires": expected_count,
+        "max_error_seconds": max((abs(e) for e in errors), default=0.0),
+        "mean_error_seconds": sum(abs(e) for e in errors) / len(errors) if errors else 0.0,
+        "pause_calls": len(stub.pause_at),
+        "get_updates_calls": stub.get_updates_calls,
+        "send_calls": stub.send_calls,
+        "sleep_calls": clock.sleep_calls,
+        "cpu_seconds": cpu_seconds,
+        "wall_seconds": wall_seconds,
+        "cpu_ms_per_day": cpu_seconds * 1000 / days if days else 0.0,
+    }
+
+
+def _format_report(results: list[dict]) -> str:
+    header = (
+        f"{'schedule':<16} {'fires':>7} {'expected':>8} {'max_err_s':>10} {'mean_err_s':>10} "
+        f"{'polls':>7} {'notify':>7} {'sleeps':>7} {'cpu_s':>8} {'cpu_ms/day':>10}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['schedule']:<16} {r['fires']:>7} {r['expected_fires']:>8} "
+            f"{r['max_error_seconds']:>10.3f} {r['mean_error_seconds']:>10.3f} "
+            f"{r['get_updates_calls']:>7} {r['send_calls']:>7} {r['sleep_calls']:>7} "
+            f"{r['cpu_seconds']:>8.3f} {r['cpu_ms_per_day']:>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Leishen Auto Pause scheduler simulation")
+    parser.add_argument("--days", type=int, default=30, help="Simulated days per schedule")
+    parser.add_argument(
+        "--start",
+        default=None,
+        help="Simulation start as 'YYYY-MM-DD HH:MM' local time (default: now)",
+    )
+    parser.add_argument("--tz", default="UTC", help="IANA time zone, e.g. Europe/Berlin")
+    parser.add_argument(
+        "--run-time",
+        action="append",
+        default=[],
+        help="Daily run time in HH:MM (repeatable)",
+    )
+    parser.add_argument(
+        "--interval-minutes",
+        action="append",
+        type=int,
+        default=[],
+        help="Interval schedule in minutes (repeatable)",
+    )
+    parser.add_argument("--poll-seconds", type=int, default=0, help="TELEGRAM_POLL_SECONDS")
+    parser.add_argument("--poll-time", default="00:00", help="TELEGRAM_POLL_TIME")
+    parser.add_argument(
+        "--tolerance-seconds",
+        type=float,
+        default=1.0,
+        help="Fail if any fire time is off by more than this",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    tz = ZoneInfo(args.tz)
+    if args.start:
+        start = datetime.strptime(args.start, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+    else:
+        start = datetime.now(tz).replace(second=0, microsecond=0)
+
+    run_times = args.run_time or ([] if args.interval_minutes else ["04:00"])
+    results = [
+        simulate_schedule(start, args.days, tz, run_time=value, poll_seconds=args.poll_seconds, poll_time=args.poll_time)
+        for value in run_times
+    ]
+    results += [
+        simulate_schedule(start, args.days, tz, interval_minutes=value, poll_seconds=args.poll_seconds, poll_time=args.poll_time)
+        for value in args.interval_minutes
+    ]
+
+    print(_format_report(results))
+
+    failed = [
+        r for r in results
+        if r["max_error_seconds"] > args.tolerance_seconds or r["fires"] != r["expected_fires"]
+    ]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
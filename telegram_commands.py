@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+
+from config.config import update_env_vars
+from runner import execute_pause, format_pause_replies, pause_targets, publish_shared_token
+
+TOKEN_USAGE_MESSAGE = "Usage: /token <new_token>"
+
+
+def _mask_token(token: str) -> str:
+    if not token:
+        return "(not set)"
+    if len(token) <= 8:
+        return "*" * len(token)
+    return f"{token[:4]}...{token[-4:]}"
+
+
+def _format_time(value: datetime | None) -> str:
+    if value is None:
+        return "-"
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _command_token(logger, cfg: dict, state: dict, args: str) -> str:
+    new_token = args.strip()
+    if not new_token:
+        return TOKEN_USAGE_MESSAGE
+
+    update_env_vars({"TOKEN": new_token})
+    cfg["account_token"] = new_token
+    publish_shared_token(logger, state, new_token)
+    state["stats"]["token_updates"] += 1
+    logger.info("token updated via telegram")
+    return f"TOKEN updated at {_format_time(state['clock'].now())}."
+
+
+def _command_pause(logger, cfg: dict, state: dict, args: str) -> str:
+    accounts = pause_targets(cfg)
+    results = [execute_pause(logger, account_cfg, state) for account_cfg in accounts]
+    return format_pause_replies(accounts, results)
+
+
+def _command_status(logger, cfg: dict, state: dict, args: str) -> str:
+    last = state.get("last_result")
+    if last:
+        last_line = f"{last['outcome']} at {_format_time(last['at'])} ({last['detail']})"
+    else:
+        last_line = "-"
+    lines = [
+        f"Token: {_mask_token(cfg.get('account_token', ''))}",
+        f"Next run: {_format_time(state.get('next_run_at'))}",
+        f"Last result: {last_line}",
+        f"Running since: {_format_time(state.get('started_at'))}",
+    ]
+    coordinator = state.get("coordinator")
+    if coordinator is not None:
+        lines.append(f"Node: {coordinator.node_id} (leader: {'yes' if coordinator.is_leader else 'no'})")
+    return "\n".join(lines)
+
+
+def _command_stats(logger, cfg: dict, state: dict, args: str) -> str:
+    stats = state["stats"]
+    return "\n".join(f"{name}: {count}" for name, count in stats.items())
+
+
+# Commands run in this order within a batch, so /pause sees a /token from the
+# same batch and /status and /stats report the state after both.
+TELEGRAM_COMMANDS = {
+    "/token": _command_token,
+    "/pause": _command_pause,
+    "/status": _command_status,
+    "/stats": _command_stats,
+}
+
+
+def parse_command(text: str) -> tuple[str, str]:
+    parts = text.split(maxsplit=1)
+    # Strip the "@botname" suffix Telegram adds in group chats.
+    name = parts[0].split("@", 1)[0].lower()
+    args = parts[1] if len(parts) > 1 else ""
+    return name, args
+
+
+def collect_commands(updates: list, chat_id: str) -> tuple[dict, list[str], int | None]:
+    # Returns the commands to run, extra replies (usage, unknown commands) and
+    # the highest update id seen.
+    commands: dict[str, str] = {}
+    unknown: list[str] = []
+    token_usage = False
+    max_update_id = None
+    for update in updates:
+        update_id = update.get("update_id")
+        if update_id is not None:
+            max_update_id = update_id if max_update_id is None else max(max_update_id, update_id)
+
+        message = update.get("message") or update.get("edited_message")
+        if not message:
+            continue
+
+        from_chat_id = str(message.get("chat", {}).get("id", ""))
+        if from_chat_id != str(chat_id):
+            continue
+
+        text = (message.get("text") or "").strip()
+        if not text.startswith("/"):
+            continue
+
+        name, args = parse_command(text)
+        if name == "/token" and not args.strip():
+            # A bare /token must not discard a valid token sent earlier in the batch.
+            token_usage = True
+        elif name in TELEGRAM_COMMANDS:
+            # Later messages in the batch override earlier ones.
+            commands[name] = args
+        elif name not in unknown:
+            unknown.append(name)
+
+    notices: list[str] = []
+    if token_usage:
+        notices.append(TOKEN_USAGE_MESSAGE)
+    if unknown:
+        supported = " ".join(TELEGRAM_COMMANDS)
+        notices.append(f"Unknown command: {' '.join(unknown)}. Supported: {supported}")
+    return commands, notices, max_update_id
+
+
+def prepare_telegram_poll(logger, cfg: dict, state: dict) -> tuple[str, str] | None:
+    if not cfg.get("telegram_enabled"):
+        return None
+    bot_token = cfg.get("telegram_bot_token", "")
+    chat_id = cfg.get("telegram_chat_id", "")
+    if not bot_token or not chat_id:
+        return None
+
+    # With several nodes only the leader reads updates; the offset is kept in
+    # the shared store so a new leader does not replay the previous batch.
+    coordinator = state.get("coordinator")
+    if coordinator is not None:
+        if not coordinator.is_leader:
+            return None
+        try:
+            stored = coordinator.get_value("telegram_offset")
+        except sqlite3.Error as exc:
+            logger.warning("coordinator read failed: %s", exc)
+            return None
+        if stored is not None:
+            state["offset"] = max(state.get("offset") or 0, int(stored))
+
+    return bot_token, chat_id
+
+
+def accept_updates(logger, state: dict, resp: dict, chat_id: str) -> tuple[dict, list[str]]:
+    if not resp.get("ok"):
+        logger.warning("telegram getUpdates returned ok=false")
+        return {}, []
+
+    updates = resp.get("result", [])
+    if not updates:
+        return {}, []
+
+    commands, notices, max_update_id = collect_commands(updates, chat_id)
+    if max_update_id is not None:
+        state["offset"] = max_update_id + 1
+        coordinator = state.get("coordinator")
+        if coordinator is not None:
+            try:
+                coordinator.set_value("telegram_offset", str(state["offset"]))
+            except sqlite3.Error as exc:
+                logger.warning("coordinator write failed: %s", exc)
+
+    if commands or notices:
+        state["stats"]["telegram_batches"] += 1
+    return commands, notices
+
+
+def run_command(logger, cfg: dict, state: dict, name: str, args: str) -> str:
+    try:
+        return TELEGRAM_COMMANDS[name](logger, cfg, state, args)
+    except Exception as exc:
+        logger.warning("telegram command %s failed: %s", name, exc)
+        return f"{name} failed: {exc}"
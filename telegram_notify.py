@@ -36,3 +36,36 @@ def get_updates(
     resp = requests.get(url, params=params, timeout=timeout_seconds)
     resp.raise_for_status()
     return resp.json()
+
+
+async def send_telegram_message_async(
+    session,
+    bot_token: str,
+    chat_id: str,
+    text: str,
+) -> Dict[str, Any]:
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    payload = {
+        "chat_id": chat_id,
+        "text": text,
+        "disable_web_page_preview": True,
+    }
+
+    async with session.post(url, json=payload) as resp:
+        resp.raise_for_status()
+        return await resp.json()
+
+
+async def get_updates_async(
+    session,
+    bot_token: str,
+    offset: Optional[int] = None,
+) -> Dict[str, Any]:
+    url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
+    params: Dict[str, Any] = {"timeout": 0}
+    if offset is not None:
+        params["offset"] = offset
+
+    async with session.get(url, params=params) as resp:
+        resp.raise_for_status()
+        return await resp.json()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+from coordinator import LeaseCoordinator, owner_of
+
+ACCOUNTS = [f"acc{i}" for i in range(20)]
+RUN_KEY = "2026-01-01 04:00"
+
+
+class LeaseCoordinatorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.t = 1000.0
+        self.nodes: list[LeaseCoordinator] = []
+
+    def tearDown(self) -> None:
+        for node in self.nodes:
+            node.close()
+        os.remove(self.db_path)
+
+    def _node(self, node_id: str) -> LeaseCoordinator:
+        node = LeaseCoordinator(self.db_path, node_id, 30, now=lambda: self.t)
+        self.nodes.append(node)
+        return node
+
+    def _claims(self, node: LeaseCoordinator) -> list[str]:
+        return [account for account in ACCOUNTS if node.claim(account, RUN_KEY)]
+
+    def test_single_leader(self) -> None:
+        a, b = self._node("a"), self._node("b")
+        self.assertTrue(a.heartbeat())
+        self.assertFalse(b.heartbeat())
+        self.assertEqual(a.live_nodes(), ["a", "b"])
+
+    def test_accounts_are_sharded_across_live_nodes(self) -> None:
+        a, b = self._node("a"), self._node("b")
+        a.heartbeat()
+        b.heartbeat()
+
+        claimed_a, claimed_b = self._claims(a), self._claims(b)
+
+        self.assertEqual(sorted(claimed_a + claimed_b), sorted(ACCOUNTS))
+        self.assertFalse(set(claimed_a) & set(claimed_b))
+        self.assertEqual(claimed_a, [x for x in ACCOUNTS if owner_of(x, ["a", "b"]) == "a"])
+
+    def test_failover_within_one_lease(self) -> None:
+        a, b = self._node("a"), self._node("b")
+        a.heartbeat()
+        b.heartbeat()
+        claimed_b = self._claims(b)
+        self.assertTrue(claimed_b)
+        last_heartbeat = self.t
+
+        # b dies holding its claims; a keeps its heartbeat cadence.
+        taken: list[str] = []
+        while not taken:
+            self.t += a.heartbeat_interval
+            self.assertLessEqual(self.t - last_heartbeat, a.lease_seconds)
+            a.heartbeat()
+            finished = a.finished(RUN_KEY)
+            taken = [x for x in claimed_b if x not in finished and a.claim(x, RUN_KEY)]
+
+        self.assertEqual(taken, claimed_b)
+        self.assertEqual(a.live_nodes(), ["a"])
+
+    def test_leadership_fails_over_within_one_lease(self) -> None:
+        a, b = self._node("a"), self._node("b")
+        a.heartbeat()
+        b.heartbeat()
+        last_heartbeat = self.t
+
+        while not b.heartbeat():
+            self.t += b.heartbeat_interval
+            self.assertLessEqual(self.t - last_heartbeat, b.lease_seconds)
+
+    def test_live_node_keeps_its_claims(self) -> None:
+        a = self._node("a")
+        a.heartbeat()
+        self.assertTrue(a.claim("acc0", RUN_KEY))
+
+        self.assertFalse(a.claim("acc0", RUN_KEY))
+
+    def test_finished_accounts_are_not_reclaimed(self) -> None:
+        a = self._node("a")
+        a.heartbeat()
+        a.claim("acc0", RUN_KEY)
+        a.claim("acc1", RUN_KEY)
+        a.complete("acc0", RUN_KEY)
+        a.complete("acc1", RUN_KEY, "failed")
+
+        self.assertEqual(a.finished(RUN_KEY), {"acc0", "acc1"})
+        self.assertFalse(a.claim("acc0", RUN_KEY))
+        self.assertFalse(a.claim("acc1", RUN_KEY))
+
+    def test_restart_releases_own_unfinished_claims(self) -> None:
+        a = self._node("a")
+        a.heartbeat()
+        a.claim("acc0", RUN_KEY)
+        a.close()
+        self.nodes.remove(a)
+
+        restarted = self._node("a")
+        restarted.heartbeat()
+        self.assertTrue(restarted.claim("acc0", RUN_KEY))
+
+    def test_shared_values(self) -> None:
+        a, b = self._node("a"), self._node("b")
+        self.assertIsNone(b.get_value("token"))
+        a.set_value("token", "t1")
+        a.set_value("token", "t2")
+        self.assertEqual(b.get_value("token"), "t2")
+
+
+if __name__ == "__main__":
+    unittest.main()
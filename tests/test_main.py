@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import logging
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import main
+from clock import VirtualClock
+from runner import new_state
+
+LOGGER = logging.getLogger("test_main")
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+class SleepWithPollTest(unittest.TestCase):
+    def test_slow_ticks_do_not_push_the_run_back(self) -> None:
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        clock = VirtualClock(start, timezone.utc, datetime(2027, 1, 1, tzinfo=timezone.utc))
+        state = new_state(clock, coordinator=SimpleNamespace(heartbeat_interval=10))
+        ticks = []
+
+        def slow_tick(logger, cfg, state) -> None:
+            # A takeover that blocks for longer than a heartbeat interval.
+            ticks.append(clock.utc_now())
+            clock.sleep(25)
+
+        with mock.patch.object(main, "_coordinator_tick", side_effect=slow_tick):
+            main._sleep_with_poll(LOGGER, {"telegram_enabled": False}, 60, state)
+
+        elapsed = (clock.utc_now() - start).total_seconds()
+        self.assertGreaterEqual(elapsed, 60)
+        self.assertLessEqual(elapsed, 60 + 25)
+        self.assertEqual(len(ticks), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
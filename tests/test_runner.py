@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from coordinator import LeaseCoordinator, owner_of
+from runner import claim_accounts, new_state, publish_shared_token, remember_shared_token, sync_shared_token
+
+LOGGER = logging.getLogger("test_runner")
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+class SharedTokenTest(unittest.TestCase):
+    def setUp(self) -> None:
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.leader = LeaseCoordinator(self.db_path, "a", 30)
+        self.owner = LeaseCoordinator(self.db_path, "b", 30)
+        self.leader_state = new_state(coordinator=self.leader)
+        self.owner_state = new_state(coordinator=self.owner)
+        patcher = mock.patch("runner.update_env_vars")
+        self.update_env_vars = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.leader.close()
+        self.owner.close()
+        os.remove(self.db_path)
+
+    def test_published_token_reaches_other_nodes(self) -> None:
+        cfg = {"account_token": "old"}
+        remember_shared_token(LOGGER, self.owner_state)
+
+        publish_shared_token(LOGGER, self.leader_state, "new")
+        sync_shared_token(LOGGER, cfg, self.owner_state)
+
+        self.assertEqual(cfg["account_token"], "new")
+        self.update_env_vars.assert_called_once_with({"TOKEN": "new"})
+
+    def test_stale_shared_token_does_not_replace_local_token(self) -> None:
+        publish_shared_token(LOGGER, self.leader_state, "old")
+        cfg = {"account_token": "fetched-locally"}
+        remember_shared_token(LOGGER, self.owner_state)
+
+        sync_shared_token(LOGGER, cfg, self.owner_state)
+        sync_shared_token(LOGGER, cfg, self.owner_state)
+
+        self.assertEqual(cfg["account_token"], "fetched-locally")
+        self.update_env_vars.assert_not_called()
+
+    def test_own_publish_is_not_reapplied(self) -> None:
+        cfg = {"account_token": "mine"}
+        publish_shared_token(LOGGER, self.owner_state, "mine")
+        cfg["account_token"] = "edited"
+
+        sync_shared_token(LOGGER, cfg, self.owner_state)
+
+        self.assertEqual(cfg["account_token"], "edited")
+        self.update_env_vars.assert_not_called()
+
+
+class ClaimAccountsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.nodes = [LeaseCoordinator(self.db_path, node_id, 30) for node_id in ("a", "b")]
+        for node in self.nodes:
+            node.heartbeat()
+        self.cfg = {
+            "account_token": "",
+            "accounts": [{"name": f"acc{i}", "token": f"t{i}"} for i in range(10)],
+        }
+
+    def tearDown(self) -> None:
+        for node in self.nodes:
+            node.close()
+        os.remove(self.db_path)
+
+    def _claim(self, node: LeaseCoordinator) -> tuple[list[str], mock.Mock]:
+        state = new_state(coordinator=node)
+        state["run_key"] = "run"
+        with mock.patch.object(node, "claim", wraps=node.claim) as claim:
+            accounts, labelled, exit_code = claim_accounts(LOGGER, self.cfg, state)
+        self.assertTrue(labelled)
+        self.assertEqual(exit_code, 0)
+        return [account["account_name"] for account in accounts], claim
+
+    def test_only_owned_unfinished_accounts_are_claimed(self) -> None:
+        a = self.nodes[0]
+        owned = [f"acc{i}" for i in range(10) if owner_of(f"acc{i}", ["a", "b"]) == "a"]
+
+        claimed, claim = self._claim(a)
+        self.assertEqual(claimed, owned)
+        self.assertEqual(claim.call_count, len(owned))
+
+        for name in owned:
+            a.complete(name, "run")
+        claimed, claim = self._claim(a)
+        self.assertEqual(claimed, [])
+        claim.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import logging
+import unittest
+from unittest import mock
+
+import main
+from runner import new_state
+from telegram_commands import TOKEN_USAGE_MESSAGE, collect_commands
+
+CHAT_ID = "42"
+LOGGER = logging.getLogger("test_telegram_commands")
+LOGGER.addHandler(logging.NullHandler())
+LOGGER.propagate = False
+
+
+def _update(update_id: int, text: str, chat_id: str = CHAT_ID) -> dict:
+    return {"update_id": update_id, "message": {"chat": {"id": int(chat_id)}, "text": text}}
+
+
+class CollectCommandsTest(unittest.TestCase):
+    def test_last_token_wins(self) -> None:
+        commands, notices, _ = collect_commands(
+            [_update(1, "/token first"), _update(2, "/token second")], CHAT_ID
+        )
+        self.assertEqual(commands, {"/token": "second"})
+        self.assertEqual(notices, [])
+
+    def test_bare_token_keeps_earlier_valid_token(self) -> None:
+        commands, notices, _ = collect_commands([_update(1, "/token good"), _update(2, "/token")], CHAT_ID)
+        self.assertEqual(commands, {"/token": "good"})
+        self.assertEqual(notices, [TOKEN_USAGE_MESSAGE])
+
+    def test_unknown_commands_are_listed_once(self) -> None:
+        commands, notices, _ = collect_commands(
+            [_update(1, "/foo"), _update(2, "/bar"), _update(3, "/foo"), _update(4, "/status@leishen_bot")],
+            CHAT_ID,
+        )
+        self.assertEqual(commands, {"/status": ""})
+        self.assertEqual(len(notices), 1)
+        self.assertTrue(notices[0].startswith("Unknown command: /foo /bar."))
+
+    def test_offset_covers_ignored_updates(self) -> None:
+        commands, notices, max_update_id = collect_commands(
+            [_update(5, "/pause"), _update(9, "/pause", chat_id="7"), _update(7, "hello")], CHAT_ID
+        )
+        self.assertEqual(commands, {"/pause": ""})
+        self.assertEqual(notices, [])
+        self.assertEqual(max_update_id, 9)
+
+
+class PollTelegramTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cfg = {
+            "account_token": "old-token",
+            "lang": "zh_CN",
+            "base_url": "http://test.invalid",
+            "timeout_seconds": 5,
+            "telegram_enabled": True,
+            "telegram_bot_token": "bot",
+            "telegram_chat_id": CHAT_ID,
+            "token_auto_refetch": False,
+        }
+        self.state = new_state()
+
+    def _poll(self, updates: list) -> mock.Mock:
+        resp = {"ok": True, "result": updates}
+        with (
+            mock.patch.object(main, "get_updates", return_value=resp) as get_updates,
+            mock.patch.object(main, "send_telegram_message") as send,
+            mock.patch("telegram_commands.update_env_vars") as update_env_vars,
+        ):
+            main._poll_telegram_for_token(LOGGER, self.cfg, self.state)
+        self.get_updates = get_updates
+        self.update_env_vars = update_env_vars
+        return send
+
+    def test_batch_gets_one_reply(self) -> None:
+        send = self._poll(
+            [_update(10, "/token new-token"), _update(11, "/stats"), _update(12, "/token"), _update(13, "/foo")]
+        )
+
+        self.assertEqual(self.cfg["account_token"], "new-token")
+        self.update_env_vars.assert_called_once_with({"TOKEN": "new-token"})
+        send.assert_called_once()
+        reply = send.call_args.args[2]
+        self.assertTrue(reply.startswith("TOKEN updated at "))
+        self.assertIn("token_updates: 1", reply)
+        self.assertIn(TOKEN_USAGE_MESSAGE, reply)
+        self.assertIn("Unknown command: /foo.", reply)
+        self.assertEqual(self.state["stats"]["telegram_batches"], 1)
+
+    def test_offset_advances_past_batch(self) -> None:
+        self._poll([_update(20, "/status"), _update(21, "hi")])
+        self.assertEqual(self.state["offset"], 22)
+
+        send = self._poll([])
+        self.assertEqual(self.get_updates.call_args.kwargs["offset"], 22)
+        send.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
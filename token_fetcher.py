@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import json
+import multiprocessing
 import re
 import time
 from typing import Optional
 from urllib.parse import parse_qs
 
-from playwright.sync_api import sync_playwright
+# Seconds on top of the fetch timeout for the worker to start and shut down.
+WORKER_GRACE_SECONDS = 30
 
 
 def _extract_token_from_text(text: str) -> Optional[str]:
@@ -41,6 +43,9 @@ def fetch_token_with_browser(
     url: str,
     timeout_seconds: int = 180,
 ) -> str:
+    # Imported here so that only the browser worker process pays for Playwright.
+    from playwright.sync_api import sync_playwright
+
     token_holder: dict[str, Optional[str]] = {"token": None}
 
     def handle_request(request) -> None:
@@ -75,3 +80,62 @@ def fetch_token_with_browser(
     if not token:
         raise TimeoutError("token not detected within timeout")
     return token
+
+
+def _apply_memory_limit(memory_limit_mb: int) -> None:
+    try:
+        import resource
+    except ImportError:
+        return
+
+    limit = memory_limit_mb * 1024 * 1024
+    # RLIMIT_DATA rather than RLIMIT_AS: Chromium reserves far more address
+    # space than it ever touches. The limit is inherited by browser processes.
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def _browser_worker(conn, url: str, timeout_seconds: int, memory_limit_mb: int) -> None:
+    try:
+        if memory_limit_mb > 0:
+            _apply_memory_limit(memory_limit_mb)
+        token = fetch_token_with_browser(url, timeout_seconds=timeout_seconds)
+        conn.send(("ok", token))
+    except BaseException as exc:
+        conn.send(("error", f"{type(exc).__name__}: {exc}"))
+    finally:
+        conn.close()
+
+
+def fetch_token_in_subprocess(
+    url: str,
+    timeout_seconds: int = 180,
+    memory_limit_mb: int = 0,
+) -> str:
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(
+        target=_browser_worker,
+        args=(child_conn, url, timeout_seconds, memory_limit_mb),
+        daemon=True,
+    )
+    process.start()
+    child_conn.close()
+
+    try:
+        if not parent_conn.poll(timeout_seconds + WORKER_GRACE_SECONDS):
+            raise TimeoutError("token fetch worker timed out")
+        try:
+            status, value = parent_conn.recv()
+        except EOFError:
+            process.join(5)
+            raise RuntimeError(f"token fetch worker exited with code {process.exitcode}") from None
+    finally:
+        parent_conn.close()
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    if status != "ok":
+        raise RuntimeError(value)
+    return value